@@ -1,8 +1,20 @@
+import io
+from collections import defaultdict
+
 import pytest
 
 from click.testing import CliRunner
 
 from ved_capture.cli import record, update
+from ved_capture.cli.ui import TerminalUI
+from ved_capture.cli.utils import (
+    flush_log_buffer,
+    print_log_buffer,
+    stream_name_prompt,
+    fps_prompt,
+    mode_prompt,
+    get_uvc_config,
+)
 
 
 class TestCli:
@@ -23,3 +35,87 @@ class TestCli:
         result = runner.invoke(update, "-l -v")
 
         assert result.exit_code == 0
+
+    def test_flush_log_buffer(self):
+        """"""
+        stream = io.StringIO()
+        assert flush_log_buffer(stream) is None
+
+        stream.write("first\n")
+        assert flush_log_buffer(stream) == "first"
+
+        stream.write("second\n")
+        assert flush_log_buffer(stream) == "second"
+        assert flush_log_buffer(stream) is None
+
+    def test_print_log_buffer(self, capsys):
+        """"""
+        stream = io.StringIO()
+        stream.write("first\n")
+        print_log_buffer(stream)
+        stream.write("second\n")
+        print_log_buffer(stream)
+        print_log_buffer(stream)
+
+        assert capsys.readouterr().out == "first\nsecond\n"
+
+    def test_stream_name_prompt(self, monkeypatch):
+        """"""
+        answers = iter(["world", "world", ""])
+        monkeypatch.setattr("builtins.input", lambda _: next(answers))
+        assert stream_name_prompt({"world": {}}, "eye0") == "eye0"
+
+    def test_fps_prompt(self, monkeypatch):
+        """"""
+        answers = iter(["fast"] * 2000 + ["60"])
+        monkeypatch.setattr("builtins.input", lambda _: next(answers))
+        assert fps_prompt(30) == 60.0
+
+    def test_mode_prompt(self, monkeypatch):
+        """"""
+        modes = [(640, 480, 30), (1280, 720, 60)]
+        answers = iter(["first"] * 1000 + ["2", "-1"] * 1000 + ["1"])
+        monkeypatch.setattr("builtins.input", lambda _: next(answers))
+        assert mode_prompt(modes) == (1280, 720, 60)
+
+    def test_get_uvc_config(self, monkeypatch):
+        """"""
+        nested_dict = lambda: defaultdict(nested_dict)  # noqa
+        config = nested_dict()
+        monkeypatch.setattr(
+            "pupil_recording_interface.VideoDeviceUVC._get_available_modes",
+            lambda uid: [(192, 192, 120), (192, 192, 200)],
+        )
+
+        # stream name from device name suffix, default answers otherwise
+        answers = iter(["", "", "1", ""])
+        monkeypatch.setattr("builtins.input", lambda _: next(answers))
+        get_uvc_config(config, "Pupil Cam2 ID0", "uid0")
+        assert config["streams"]["video"]["eye0"] == {
+            "device_type": "uvc",
+            "device_uid": "Pupil Cam2 ID0",
+            "resolution": "(192, 192)",
+            "fps": 200,
+            "color_format": "gray",
+        }
+
+        # skipped device
+        monkeypatch.setattr("builtins.input", lambda _: "n")
+        get_uvc_config(config, "Pupil Cam2 ID1", "uid1")
+        assert "eye1" not in config["streams"]["video"]
+
+    def test_get_status_str(self):
+        """"""
+        ui = TerminalUI("test", temp_file_handler=True)
+        ui.keymap = {"q": ("quit", None)}
+
+        # no status, blank line before keymap
+        status_str, num_lines = ui._get_status_str()
+        assert status_str.startswith("\n")
+        assert num_lines == 2
+
+        # fixed status
+        ui.fixed_status = "Recording"
+        status_str, num_lines = ui._get_status_str()
+        assert "Recording" in status_str.splitlines()[0]
+        assert num_lines == 2
@@ -1,9 +1,24 @@
+import csv
+import io
+import os
+from collections import OrderedDict, defaultdict
 from pathlib import Path
 
 import pytest
-from confuse import NotFoundError
-
-from ved_capture.config import ConfigParser, flatten, save_config
+import yaml
+from confuse import Loader, NotFoundError
+
+from ved_capture.config import (
+    DEFAULT_CONFIG_FILE,
+    ConfigParser,
+    flatten,
+    default_to_regular,
+    _parse_resolution,
+    _fast_clone,
+    _load_config_file,
+    save_config,
+    save_metadata,
+)
 
 
 class TestConfigParser:
@@ -22,6 +37,7 @@ class TestConfigParser:
             parser.config["streams"]["video"]["t265"]["device_uid"].get()
             is None
         )
+        assert parser.config.sources[-1].default
 
         # config file by name
         parser = ConfigParser("config_minimal")
@@ -30,6 +46,25 @@ class TestConfigParser:
             == "test_site"
         )
 
+    def test_config_dir(self, config_dir, tmpdir, monkeypatch):
+        """"""
+        assert Path(ConfigParser.config_dir()) == Path(config_dir)
+
+        # cached directory follows changes of the environment variable
+        monkeypatch.setenv("VEDCDIR", str(tmpdir))
+        assert Path(ConfigParser.config_dir()) == Path(tmpdir)
+
+    def test_user_config(self, tmpdir, monkeypatch):
+        """"""
+        monkeypatch.setenv("VEDCDIR", str(tmpdir))
+        user_config_file = str(tmpdir / "config.yaml")
+        with open(user_config_file, "w") as f:
+            f.write("commands:\n  record:\n    folder: %Y_%m_%d\n")
+
+        parser = ConfigParser()
+        assert parser.config.sources[0].filename == user_config_file
+        assert parser.get_command_config("record", "folder") == "%Y_%m_%d"
+
     def test_get_stream_config(self, parser, parser_override):
         """"""
         # single updated value
@@ -77,6 +112,11 @@ class TestConfigParser:
             "policy",
         }
 
+        # missing value
+        with pytest.raises(NotFoundError):
+            parser.get_command_config("record", "not_a_key")
+        assert parser.get_command_config("record", "not_a_key", default=1) == 1
+
     def test_set_profile(self, parser):
         """"""
         parser.set_profile("outdoor")
@@ -115,6 +155,10 @@ class TestConfigParser:
         folder = parser.get_folder("record", folder=config_dir)
         assert folder == config_dir
 
+        # missing metadata
+        with pytest.raises(ValueError, match="'subject_id'"):
+            parser.get_folder("record")
+
     def test_get_policy(self, parser, parser_minimal, parser_override):
         """"""
         # test config file
@@ -135,6 +179,25 @@ class TestConfigParser:
         # user specified
         assert not parser.get_show_video(False)
 
+    def test_config_cache(self, parser):
+        """"""
+        assert parser.get_policy("record") == "overwrite"
+        assert parser.get_show_video()
+
+        # setting values invalidates cached lookups
+        parser.config["commands"]["record"]["policy"] = "here"
+        parser.config["commands"]["record"]["show_video"] = False
+        assert parser.get_policy("record") == "here"
+        assert not parser.get_show_video()
+
+        # returned dicts can be modified without affecting the cache
+        config = parser.get_stream_config("video", "eye0")
+        config["fps"] = None
+        config["pipeline"] = []
+        config = parser.get_stream_config("video", "eye0")
+        assert config["fps"] == 200
+        assert "pipeline" not in config
+
     def test_get_recording_cam_params(self, parser_minimal):
         """"""
         # minimal/package default
@@ -156,6 +219,17 @@ class TestConfigParser:
         monkeypatch.setattr("builtins.input", lambda x: "001")
         assert parser.get_metadata() == {"subject_id": "001"}
 
+        # end of input
+        def no_input(prompt):
+            raise EOFError()
+
+        monkeypatch.setattr("builtins.input", no_input)
+        assert parser.get_metadata() == {"subject_id": "000"}
+
+        # from environment
+        monkeypatch.setenv("VEDC_META_SUBJECT_ID", "002")
+        assert parser.get_metadata() == {"subject_id": "002"}
+
         # override
         assert parser_override.get_metadata() == {}
 
@@ -263,6 +337,81 @@ class TestMethods:
         }
         assert set(config["streams"]["video"].keys()) == {"t265"}
 
+    def test_parse_resolution(self):
+        """"""
+        assert _parse_resolution("(1280, 720)") == (1280, 720)
+        assert _parse_resolution("(1280,720)") == (1280, 720)
+        assert _parse_resolution("(1280.0, 720.0)") == (1280.0, 720.0)
+        assert _parse_resolution("[1280, 720]") == (1280, 720)
+        with pytest.raises(SyntaxError):
+            _parse_resolution("(1280, 720))")
+        with pytest.raises(SyntaxError):
+            _parse_resolution("1280, 720)")
+        assert _parse_resolution([1280, 720]) == (1280, 720)
+        assert _parse_resolution((1280, 720)) == (1280, 720)
+
+    def test_fast_clone(self):
+        """"""
+        data = OrderedDict(
+            [("fps", 30), ("resolution", [1280, 720]), ("controls", {})]
+        )
+        clone = _fast_clone(data)
+        assert clone == data
+        assert type(clone) is OrderedDict
+        assert clone["resolution"] is not data["resolution"]
+        assert clone["controls"] is not data["controls"]
+
+    def test_load_config_file(self, tmpdir):
+        """"""
+        filename = str(tmpdir / "config.yaml")
+        with open(filename, "w") as f:
+            f.write("version: 2.0.0\n")
+        mtime_ns = os.stat(filename).st_mtime_ns
+        assert _load_config_file(filename) == {"version": "2.0.0"}
+
+        # changed file with the same modification time is parsed again
+        with open(filename, "w") as f:
+            f.write("version: 2.10.0\n")
+        os.utime(filename, ns=(mtime_ns, mtime_ns))
+        assert _load_config_file(filename) == {"version": "2.10.0"}
+
+        # plain scalars starting with % as allowed by confuse's Loader
+        with open(filename, "w") as f:
+            f.write("fmt: %Y-%m-%d\n")
+        assert _load_config_file(filename) == {"fmt": "%Y-%m-%d"}
+
+    def test_load_default_config(self):
+        """"""
+        # defaults are parsed exactly like confuse would parse them
+        source = _load_config_file(DEFAULT_CONFIG_FILE, default=True)
+        with open(DEFAULT_CONFIG_FILE) as f:
+            assert source == yaml.load(f, Loader=Loader)
+        assert source.default
+
+    def test_default_to_regular(self):
+        """"""
+        nested_dict = lambda: defaultdict(nested_dict)  # noqa
+        config = nested_dict()
+        config["streams"]["video"]["world"]["fps"] = 30
+        config["commands"]["record"]["video"] = {}
+
+        regular = default_to_regular(config)
+        assert regular == {
+            "streams": {"video": {"world": {"fps": 30}}},
+            "commands": {"record": {"video": {}}},
+        }
+        assert type(regular["streams"]["video"]["world"]) is dict
+
+        # deep nesting doesn't hit the recursion limit
+        leaf = config
+        for _ in range(2000):
+            leaf = leaf["level"]
+        leaf = default_to_regular(config)
+        for _ in range(2000):
+            assert type(leaf) is dict
+            leaf = leaf["level"]
+        assert leaf == {}
+
     def test_save_config(self, tmpdir, parser, parser_override):
         """"""
         # dict
@@ -273,3 +422,20 @@ class TestMethods:
 
         # override config
         save_config(tmpdir, parser_override.config)
+
+    def test_save_metadata(self, tmpdir):
+        """"""
+        metadata = {
+            "subject_id": "000",
+            "notes": 'first, "second"\nthird',
+            "empty": None,
+        }
+        save_metadata(tmpdir, metadata)
+
+        # output is identical to csv.writer
+        expected = io.StringIO(newline="")
+        writer = csv.writer(expected)
+        writer.writerow(["key", "value"])
+        writer.writerows(metadata.items())
+        with open(tmpdir / "user_info.csv", newline="") as f:
+            assert f.read() == expected.getvalue()
@@ -1,5 +1,4 @@
 import importlib
-import inspect
 import sys
 import traceback
 import tarfile
@@ -47,7 +46,7 @@ from ved_capture.config import ConfigParser
 )
 def update(verbose, local, branch, stash, pri_branch, pri_path, force):
     """ Update installation. """
-    logger = init_logger(inspect.stack()[0][3], verbosity=verbose)
+    logger = init_logger("update", verbosity=verbose)
 
     if pri_branch and pri_path:
         raise_error(
@@ -103,7 +102,7 @@ def update(verbose, local, branch, stash, pri_branch, pri_path, force):
 )
 def check_install(verbose):
     """ Test installation. """
-    logger = init_logger(inspect.stack()[0][3], verbosity=verbose)
+    logger = init_logger("check_install", verbosity=verbose)
 
     failures = []
 
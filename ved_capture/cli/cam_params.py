@@ -1,5 +1,3 @@
-import inspect
-
 import click
 import pupil_recording_interface as pri
 
@@ -35,7 +33,7 @@ from ved_capture.config import ConfigParser
 )
 def estimate_cam_params(streams, config_file, extrinsics, verbose):
     """ Estimate camera parameters. """
-    ui = TerminalUI(inspect.stack()[0][3], verbosity=verbose)
+    ui = TerminalUI("estimate_cam_params", verbosity=verbose)
 
     if len(streams) == 0:
         raise_error(
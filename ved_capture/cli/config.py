@@ -1,4 +1,3 @@
-import inspect
 import subprocess
 import sys
 from collections import defaultdict
@@ -54,7 +53,7 @@ from ved_capture.utils import (
 )
 def generate_config(folder, name, test_folder, no_metadata, verbose):
     """ Generate configuration. """
-    logger = init_logger(inspect.stack()[0][3], verbosity=verbose)
+    logger = init_logger("generate_config", verbosity=verbose)
 
     # check folder
     folder = Path(folder or ConfigParser.config_dir()).expanduser()
@@ -158,7 +157,7 @@ def generate_config(folder, name, test_folder, no_metadata, verbose):
 )
 def auto_config(verbose, test_folder, no_metadata):
     """ Auto-generate configuration. """
-    logger = init_logger(inspect.stack()[0][3], verbosity=verbose)
+    logger = init_logger("auto_config", verbosity=verbose)
 
     # check folder
     folder = Path(ConfigParser.config_dir()).expanduser()
@@ -288,7 +287,7 @@ def auto_config(verbose, test_folder, no_metadata):
 )
 def edit_config(folder, name, editor, verbose):
     """ Edit configuration. """
-    logger = init_logger(inspect.stack()[0][3], verbosity=verbose)
+    logger = init_logger("edit_config", verbosity=verbose)
 
     # check file
     folder = Path(folder or ConfigParser.config_dir()).expanduser()
@@ -1,5 +1,3 @@
-import inspect
-
 import click
 
 from ved_capture.cli.utils import init_logger, raise_error
@@ -16,7 +14,7 @@ from ved_capture.utils import (
 )
 def device_info(verbose):
     """ Print information about connected devices. """
-    logger = init_logger(inspect.stack()[0][3], verbosity=verbose)
+    logger = init_logger("device_info", verbosity=verbose)
 
     # get connected devices
     pupil_devices = get_pupil_devices()
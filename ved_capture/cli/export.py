@@ -1,5 +1,4 @@
 from pathlib import Path
-import inspect
 from pprint import pformat
 
 import click
@@ -33,7 +32,7 @@ def export(folder, topics, file_type, format, verbose):
     - echo: print export to command line. Not supported for pldata types.
     - nc, netcdf: netCDF4 format. Supported for pldata types.
     """
-    logger = init_logger(inspect.stack()[0][3], verbosity=verbose)
+    logger = init_logger("export", verbosity=verbose)
 
     # check folder
     folder = Path(folder)
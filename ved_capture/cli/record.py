@@ -1,5 +1,3 @@
-import inspect
-
 import click
 import pupil_recording_interface as pri
 
@@ -40,9 +38,7 @@ from ved_capture.config import ConfigParser, save_config, save_metadata
 )
 def record(config_file, profile, verbose):
     """ Run recording. """
-    ui = TerminalUI(
-        inspect.stack()[0][3], verbosity=verbose, temp_file_handler=True
-    )
+    ui = TerminalUI("record", verbosity=verbose, temp_file_handler=True)
 
     # parse config
     with ConfigParser(config_file) as config_parser:
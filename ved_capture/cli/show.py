@@ -1,5 +1,3 @@
-import inspect
-
 import click
 import pupil_recording_interface as pri
 
@@ -30,7 +28,7 @@ from ved_capture.config import ConfigParser
 )
 def show(streams, config_file, profile, verbose):
     """ Show video streams. """
-    ui = TerminalUI(inspect.stack()[0][3], verbosity=verbose)
+    ui = TerminalUI("show", verbosity=verbose)
 
     if len(streams) == 0:
         raise_error("Please specify at least one stream to show")
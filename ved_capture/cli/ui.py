@@ -1,9 +1,13 @@
 """"""
 import io
+import logging
+import multiprocessing as mp
 import re
+import selectors
+import sys
+from logging.handlers import QueueHandler, QueueListener
 
 from blessed import Terminal
-import multiprocessing_logging
 
 from ved_capture.utils import beep
 from ved_capture.cli.utils import (
@@ -13,49 +17,72 @@ from ved_capture.cli.utils import (
     raise_error,
 )
 
+LOG_LEVEL_PATTERN = re.compile(r"\[(ERROR|WARNING|INFO|DEBUG)\]")
 
-def _format_log_buffer(t, log_buffer):
-    """ Add pretty formatting to log messages. """
-    log_buffer = log_buffer.replace("[ERROR]", t.bold(t.red2("[ERROR]")))
-    log_buffer = log_buffer.replace(
-        "[WARNING]", t.bold(t.goldenrod("[WARNING]"))
-    )
-    log_buffer = log_buffer.replace("[INFO]", t.bold(t.steelblue("[INFO]")))
-    log_buffer = log_buffer.replace("[DEBUG]", t.bold("[DEBUG]"))
 
-    return log_buffer
-
-
-def refresh(t, log_buffer, status_buffer, timeout=0.1, num_empty_lines=1):
+def _write(data):
+    """ Write to stdout, encoding only once and bypassing the text layer. """
+    sys.stdout.flush()
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        sys.stdout.write(data)
+        sys.stdout.flush()
+    else:
+        buffer.write(data.encode(sys.stdout.encoding or "utf-8"))
+        buffer.flush()
+
+
+def refresh(
+    t,
+    log_buffer,
+    status_buffer,
+    timeout=0.1,
+    num_empty_lines=1,
+    selector=None,
+    num_status_lines=None,
+):
     """ Refresh terminal output and return user input. """
     if not hasattr(refresh, "last_log_line"):
         # last_log_line persists across calls and stores the line number of
         # the last line that was written from the log
         refresh.last_log_line = t.get_location()[0]
 
-    # print log buffer
+    # collect all output and write it at once where possible
     if log_buffer is not None:
-        log_buffer = _format_log_buffer(t, log_buffer)
-        print(t.move_xy(0, refresh.last_log_line) + t.clear_eos + log_buffer)
+        out = [
+            t.move_xy(0, refresh.last_log_line),
+            t.clear_eos,
+            log_buffer,
+            "\n",
+        ]
     else:
-        print(t.move_xy(0, refresh.last_log_line) + t.move_up)
+        out = [t.move_xy(0, refresh.last_log_line), t.move_up, "\n"]
 
     # print status buffer
     if status_buffer is not None:
+        # the log has to be written before querying the cursor location
+        _write("".join(out))
+        out = []
+
         # compute the actual offset between cursor location and bottom of the
         # screen as well as the desired offset when printing the status buffer
         # and possibly empty lines between log and status
-        num_status_lines = len(status_buffer.splitlines()) + 1
+        if num_status_lines is None:
+            num_status_lines = len(status_buffer.splitlines())
+        num_status_lines += 1
+        # query the cursor position and terminal size only once since each
+        # location request is a round-trip through the terminal
         refresh.last_log_line = t.get_location()[0]
-        actual_offset = t.height - t.get_location()[0]
+        height = t.height
+        actual_offset = height - refresh.last_log_line
         desired_offset = num_status_lines + num_empty_lines
 
         # print empty lines if desired offset is smaller than actual offset
         if desired_offset > actual_offset:
             refresh.last_log_line -= desired_offset - actual_offset
-            print("\n" * (desired_offset - 2))
+            out.append("\n" * (desired_offset - 1))
 
-        first_status_line = t.height - num_status_lines
+        first_status_line = height - num_status_lines
         if not hasattr(refresh, "last_num_status_lines"):
             # last_num_status_lines persists across calls and stores number of
             # status lines from the previous call
@@ -64,19 +91,30 @@ def refresh(t, log_buffer, status_buffer, timeout=0.1, num_empty_lines=1):
         status_line_diff = refresh.last_num_status_lines - num_status_lines
         refresh.last_num_status_lines = num_status_lines
         if status_line_diff > 0:
-            print(
+            out.append(
                 t.move_y(first_status_line - status_line_diff)
                 + t.clear_eos
                 + "\n" * status_line_diff
-                + status_buffer
             )
         else:
-            print(t.move_y(first_status_line) + t.clear_eos + status_buffer)
+            out.append(t.move_y(first_status_line) + t.clear_eos)
+        out.append(status_buffer + "\n")
     else:
-        print(t.clear_eos + t.move_up)
+        out.append(t.clear_eos + t.move_up + "\n")
+
+    _write("".join(out))
 
-    # wait for keypress
+    return get_key(t, timeout=timeout, selector=selector)
+
+
+def get_key(t, timeout=0.1, selector=None):
+    """ Wait for user input without writing to the terminal. """
     with t.cbreak():
+        if selector is not None:
+            # sleep until stdin is readable or the timeout has elapsed and
+            # let blessed decode whatever is available without waiting again
+            selector.select(timeout)
+            timeout = 0
         key = t.inkey(timeout)
         if key.is_sequence:
             return key.name
@@ -109,6 +147,22 @@ class TerminalUI:
         self.command_name = command_name
 
         self.term = Terminal()
+        # raw escape sequences, concatenated directly on the hot path
+        self._c = {
+            "bold": str(self.term.bold),
+            "red": str(self.term.red2),
+            "gold": str(self.term.goldenrod),
+            "green": str(self.term.green),
+            "steel": str(self.term.steelblue),
+            "firebrick": str(self.term.firebrick),
+            "normal": str(self.term.normal),
+        }
+        self._level_colors = {
+            "[ERROR]": self._bold("[ERROR]", color=self._c["red"]),
+            "[WARNING]": self._bold("[WARNING]", color=self._c["gold"]),
+            "[INFO]": self._bold("[INFO]", color=self._c["steel"]),
+            "[DEBUG]": self._bold("[DEBUG]"),
+        }
         self.f_stdout = io.StringIO()
         self.logger, self.file_handler = init_logger(
             self.command_name,
@@ -122,35 +176,117 @@ class TerminalUI:
 
         self.manager = None
         self.statusmap = {}
+        self._cached_key_str = None
         self.keymap = {}
         self.fixed_status = None
 
+        self._fps_patterns = {}
+        self._device_fps = {}
         self._disconnect_map = {}
+        self._any_disconnect_change = False
+        self._last_frame = None
+
+        self._log_queue = None
+        self._log_listener = None
+
+        self._selector = None
+        if sys.stdin.isatty():
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(sys.stdin, selectors.EVENT_READ)
 
     def __enter__(self):
-        multiprocessing_logging.install_mp_handler()
+        self._install_queue_handler()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        multiprocessing_logging.uninstall_mp_handler()
+        self._uninstall_queue_handler()
+        # write buffered log records before reporting the outcome
+        self.file_handler.flush()
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
         if exc_type:
             self.logger.debug(exc_val, exc_info=True)
-            refresh(self.term, flush_log_buffer(self.f_stdout), None)
+            refresh(self.term, self._get_log_buffer(), None)
             raise_error(
-                self.term.red2(self.term.bold(str(exc_val))), self.logger
+                self._bold(str(exc_val), color=self._c["red"]), self.logger
             )
         else:
-            refresh(self.term, flush_log_buffer(self.f_stdout), None)
-            print(self.term.bold(self.term.firebrick("Stopped")))
+            refresh(self.term, self._get_log_buffer(), None)
+            print(self._bold("Stopped", color=self._c["firebrick"]))
+
+    def _bold(self, text, color=""):
+        """ Make text bold and optionally colored. """
+        return f"{self._c['bold']}{color}{text}{self._c['normal']}"
+
+    def _install_queue_handler(self):
+        """ Route log records from all processes through a single queue. """
+        if self._log_listener is not None:
+            # already installed, e.g. when the UI is entered again
+            return
+
+        root_logger = logging.getLogger()
+        handlers = root_logger.handlers[:]
+        for handler in handlers:
+            root_logger.removeHandler(handler)
+
+        self._log_queue = mp.Queue(-1)
+        self._log_listener = QueueListener(
+            self._log_queue, *handlers, respect_handler_level=True
+        )
+        root_logger.addHandler(QueueHandler(self._log_queue))
+        self._log_listener.start()
+
+    def _uninstall_queue_handler(self):
+        """ Stop the log listener and restore the original handlers. """
+        if self._log_listener is None:
+            return
+
+        root_logger = logging.getLogger()
+        self._log_listener.stop()
+        for handler in root_logger.handlers[:]:
+            if isinstance(handler, QueueHandler):
+                root_logger.removeHandler(handler)
+        for handler in self._log_listener.handlers:
+            root_logger.addHandler(handler)
+
+        self._log_queue.close()
+        self._log_queue = None
+        self._log_listener = None
+
+    @property
+    def keymap(self):
+        """ Mapping from keys to (description, callable) tuples. """
+        return self._keymap
+
+    @keymap.setter
+    def keymap(self, keymap):
+        self._keymap = keymap
+        self._cached_key_str = None
+
+    def _get_key_str(self):
+        """ Get the formatted key mappings, re-formatting only on change. """
+        if self._cached_key_str is None:
+            self._cached_key_str = " - ".join(
+                f"[{self._bold(key)}] {name}"
+                for key, (name, _) in self._keymap.items()
+            )
+
+        return self._cached_key_str
 
     def _replace_key(self, key, desc, call_fn, new_key=None, new_desc=None):
         """ Replace a key in the keymap while maintaining its order. """
-        self.keymap = {
-            (new_key or key if k == key else k): (
-                (new_desc or desc, call_fn) if k == key else v
-            )
-            for k, v in self.keymap.items()
-        }
+        if new_key is None or new_key == key:
+            # same key, the entry can be updated in place
+            self._keymap[key] = (new_desc or desc, call_fn)
+            self._cached_key_str = None
+        else:
+            self.keymap = {
+                (new_key if k == key else k): (
+                    (new_desc or desc, call_fn) if k == key else v
+                )
+                for k, v in self.keymap.items()
+            }
 
     def add_key(
         self,
@@ -243,6 +379,8 @@ class TerminalUI:
         else:
             self.keymap[key] = (description, call_fn)
 
+        self._cached_key_str = None
+
     @classmethod
     def nop(cls):
         """ Placeholder method for keys that don't get handled via keymap. """
@@ -251,17 +389,31 @@ class TerminalUI:
         """ Attach to a StreamManager. """
         self.manager = manager
         self.statusmap = statusmap or {}
-        self.keymap = keymap or {}
+        self._keymap = keymap or {}
 
         # move log file to manager folder if it was temporary
         if self.temp_file_handler:
-            add_file_handler(
+            listener = self._log_listener
+            if listener is not None:
+                # process pending records before moving the log file
+                listener.stop()
+            file_handler = add_file_handler(
                 self.command_name, manager.folder, replace=self.file_handler
             )
+            if listener is not None:
+                # the new handler is served by the listener, not the root
+                logging.getLogger().removeHandler(file_handler)
+                listener.handlers = tuple(
+                    file_handler if handler is self.file_handler else handler
+                    for handler in listener.handlers
+                )
+                listener.start()
+            self.file_handler = file_handler
             self.temp_file_handler = False
 
         def stop_manager():
             self.logger.info("Stopping...")
+            self.file_handler.flush()
             self.manager.stopped = True
 
         self.keymap["q"] = ("quit", stop_manager)
@@ -276,87 +428,133 @@ class TerminalUI:
             if not callable(tup[1]):
                 raise ValueError(f"Key '{key}': value[1] is not callable")
 
+        self._cached_key_str = None
+
+        # pre-compile patterns for coloring the fps of each stream
+        self._fps_patterns = {}
+        self._device_fps = {}
+        if "fps" in self.statusmap:
+            value_pattern = re.sub(
+                r"{.*:.*}", r"([0-9]*\.?[0-9]*)", self.statusmap["fps"]
+            )
+            for name, stream in self.manager.streams.items():
+                if hasattr(stream.device, "fps"):
+                    self._fps_patterns[name] = re.compile(
+                        f"{name}: " + value_pattern
+                    )
+                    self._device_fps[name] = stream.device.fps
+
         self._disconnect_map = {name: None for name in self.manager.streams}
 
+    def _format_log_buffer(self, log_buffer):
+        """ Add pretty formatting to log messages. """
+        return LOG_LEVEL_PATTERN.sub(
+            lambda match: self._level_colors[match.group(0)], log_buffer
+        )
+
+    def _get_log_buffer(self):
+        """ Get formatted log messages since the last call. """
+        log_buffer = flush_log_buffer(self.f_stdout)
+        if log_buffer is not None:
+            log_buffer = self._format_log_buffer(log_buffer)
+
+        return log_buffer
+
     def _wrap(self, line):
-        """ Wrap long lines. """
-        return "\n".join(self.term.wrap(line, subsequent_indent=" "))
+        """ Wrap long lines into a list of lines. """
+        return self.term.wrap(line, subsequent_indent=" ")
 
     def _format_status(self, val, fmt):
-        """ Format stream statuses. """
+        """ Format stream statuses as a list of lines. """
         status = self.manager.format_status(val, format=fmt)
         if status is not None:
             if val == "fps":
                 # TODO hacky coloring of fps
-                for name, stream in self.manager.streams.items():
-                    if hasattr(stream.device, "fps"):
-                        pattern = re.compile(
-                            f"{name}: "
-                            + re.sub(r"{.*:.*}", r"([0-9]*\.?[0-9]*)", fmt)
+                for name, pattern in self._fps_patterns.items():
+                    fps_search = pattern.search(status)
+                    if fps_search and fps_search.group(1):
+                        value = fps_search.group(1)
+                        fps = float(value)
+                        ratio = fps / self._device_fps[name]
+                        if ratio >= 0.95:
+                            color = self._c["green"]
+                        elif ratio >= 0.8:
+                            color = self._c["gold"]
+                        else:
+                            color = self._c["red"]
+                        # color the matched value in place, then reset the
+                        # color and restore bold
+                        start, end = fps_search.span(1)
+                        status = (
+                            f"{status[:start]}{color}{value}"
+                            f"{self._c['normal']}{self._c['bold']}"
+                            f"{status[end:]}"
                         )
-                        fps_search = re.search(pattern, status)
-                        if fps_search:
-                            fps = float(fps_search.group(1))
-                            ratio = fps / stream.device.fps
-                            if ratio >= 0.95:
-                                color = self.term.green
-                            elif ratio >= 0.8:
-                                color = self.term.goldenrod
-                            else:
-                                color = self.term.red2
-                            status = status.replace(
-                                f"{name}: {fmt.format(fps)}",
-                                f"{name}: {color(fmt.format(fps))}",
-                            )
 
             status = self._wrap(
-                self.term.bold(
-                    status.replace("no data", self.term.red2("no data"))
+                self._bold(
+                    status.replace(
+                        "no data",
+                        f"{self._c['red']}no data"
+                        f"{self._c['normal']}{self._c['bold']}",
+                    )
                 )
             )
 
         return status
 
     def _get_status_str(self):
-        """ Get status and key mappings. """
+        """ Get status and key mappings as well as the number of lines. """
         if self.fixed_status is None:
             # format stream statuses
-            status_list = [
-                self._format_status(val, fmt)
-                for val, fmt in self.statusmap.items()
-            ]
-            status_str = "\n".join(s for s in status_list if s is not None)
+            lines = []
+            for val, fmt in self.statusmap.items():
+                status = self._format_status(val, fmt)
+                if status is not None:
+                    lines.extend(status)
         else:
-            status_str = self._wrap(self.term.bold(self.fixed_status))
-
-        # format keymap
-        keymap_str = " - ".join(
-            [
-                f"[{self.term.bold(key)}] {name}"
-                for key, (name, _) in self.keymap.items()
-            ]
-        )
-        if len(keymap_str):
-            status_str += "\n" + self._wrap(keymap_str)
+            lines = self._wrap(self._bold(self.fixed_status))
 
-        return status_str
+        # add pre-formatted keymap
+        key_str = self._get_key_str()
+        if len(key_str):
+            # without any status, a blank line separates log and keymap
+            if not lines:
+                lines.append("")
+            lines.extend(self._wrap(key_str))
+
+        return "\n".join(lines), len(lines)
 
     def _check_for_disconnect(self):
         """ Check if a stream has been disconnected. """
-        for name, was_disconnected in self._disconnect_map.copy().items():
+        self._any_disconnect_change = False
+        status = self.manager.status
+        dbg = self.logger.isEnabledFor(logging.DEBUG)
+
+        # only values are rebound inside the loop, so no copy is needed
+        for name, was_disconnected in self._disconnect_map.items():
             try:
-                is_disconnected = not self.manager.status[name]["running"]
+                is_disconnected = not status[name]["running"]
             except KeyError:
                 continue
+            if was_disconnected is is_disconnected:
+                continue
+
             if was_disconnected is None and not is_disconnected:
-                self.logger.debug("Initial connect registered by UI.")
+                if dbg:
+                    self.logger.debug("Initial connect registered by UI.")
+                self._any_disconnect_change = True
                 self._disconnect_map[name] = False
             elif was_disconnected is False and is_disconnected:
-                self.logger.debug("Disconnect registered by UI.")
+                if dbg:
+                    self.logger.debug("Disconnect registered by UI.")
+                self._any_disconnect_change = True
                 self._disconnect_map[name] = True
                 beep([440, 0, 0], seconds=0.2)
             elif was_disconnected and not is_disconnected:
-                self.logger.debug("Reconnect registered by UI.")
+                if dbg:
+                    self.logger.debug("Reconnect registered by UI.")
+                self._any_disconnect_change = True
                 self._disconnect_map[name] = False
                 beep([880, 0, 880, 0, 0, 0], seconds=0.05)
 
@@ -370,17 +568,35 @@ class TerminalUI:
 
         while not self.manager.stopped:
             self._check_for_disconnect()
-            log_buffer = flush_log_buffer(self.f_stdout)
-            status_str = self._get_status_str()
+            log_buffer = self._get_log_buffer()
+            status_str, num_status_lines = self._get_status_str()
 
-            # get keypresses from manager
-            if self.manager.keypresses._getvalue():
+            # get all pending keypresses from manager
+            while self.manager.keypresses._getvalue():
                 key = self.manager.keypresses.popleft()
                 if key in self.keymap:
                     self.keymap[key][1]()
 
+            # skip redrawing if nothing changed since the last frame
+            frame = (status_str, self.term.width, self.term.height)
+            redraw = (
+                log_buffer is not None
+                or frame != self._last_frame
+                or self._any_disconnect_change
+            )
+
             # get keypresses from terminal
             with self.term.hidden_cursor():
-                key = refresh(self.term, log_buffer, status_str)
+                if redraw:
+                    key = refresh(
+                        self.term,
+                        log_buffer,
+                        status_str,
+                        selector=self._selector,
+                        num_status_lines=num_status_lines,
+                    )
+                    self._last_frame = frame
+                else:
+                    key = get_key(self.term, selector=self._selector)
                 if key in self.keymap:
                     self.keymap[key][1]()
@@ -1,9 +1,12 @@
 """"""
+import io
 import logging
-import pprint
+import os
 import shutil
 import sys
 import tempfile
+from functools import lru_cache
+from logging.handlers import MemoryHandler
 from pathlib import Path
 
 import click
@@ -15,30 +18,64 @@ logger = logging.getLogger(__name__)
 
 TRACE = 5
 
+FILE_FORMAT = "%(asctime)s | %(name)s | %(levelname)s: %(message)s"
+
+# default stream names for Pupil cams by device name suffix
+UVC_STREAM_NAMES = {"ID0": "eye0", "ID1": "eye1", "ID2": "world"}
+
+# stream handler installed by the last call to init_logger
+_stream_handler = None
+
+
+@lru_cache(maxsize=8)
+def _get_formatter(fmt):
+    """ Get a shared formatter for a format string. """
+    return logging.Formatter(fmt)
+
 
 def add_file_handler(
     subcommand, folder=None, replace=None, level=TRACE, mode="a"
 ):
     """ Add a file handler to the root logger. """
     root_logger = logging.getLogger("")
-    file_formatter = logging.Formatter(
-        "%(asctime)s | %(name)s | %(levelname)s: %(message)s"
-    )
-    log_file = Path(folder or ConfigParser().config.config_dir()) / (
+    log_file = Path(folder or ConfigParser.config_dir()) / (
         "vedc." + subcommand + ".log"
     )
 
     if replace:
+        # closing the buffering handler flushes it into the file handler
+        target = getattr(replace, "target", replace)
         replace.close()
         root_logger.removeHandler(replace)
-        shutil.move(replace.baseFilename, log_file)
+        target.close()
+        shutil.move(target.baseFilename, log_file)
+    else:
+        # re-use an existing handler for the same file instead of logging
+        # every record twice
+        for handler in root_logger.handlers:
+            target = getattr(handler, "target", handler)
+            if isinstance(
+                target, logging.FileHandler
+            ) and target.baseFilename == os.path.abspath(log_file):
+                handler.setLevel(level)
+                target.setLevel(level)
+                return handler
 
     file_handler = logging.FileHandler(log_file, mode=mode)
-    file_handler.setFormatter(file_formatter)
+    file_handler.setFormatter(_get_formatter(FILE_FORMAT))
     file_handler.setLevel(level)
-    root_logger.addHandler(file_handler)
 
-    return file_handler
+    # buffer records and write them in batches, warnings are written at once
+    memory_handler = MemoryHandler(
+        512,
+        flushLevel=logging.WARNING,
+        target=file_handler,
+        flushOnClose=True,
+    )
+    memory_handler.setLevel(level)
+    root_logger.addHandler(memory_handler)
+
+    return memory_handler
 
 
 def init_logger(
@@ -61,12 +98,23 @@ def init_logger(
     root_logger = logging.getLogger()
     root_logger.setLevel(TRACE)
 
-    # stream handler
-    stream_formatter = logging.Formatter(stream_format)
-    stream_handler = logging.StreamHandler(stream)
-    stream_handler.setLevel(verbosity_map[int(verbosity)])
-    stream_handler.setFormatter(stream_formatter)
-    root_logger.addHandler(stream_handler)
+    # stream handler, replacing the one from a previous call
+    global _stream_handler
+    if _stream_handler is not None:
+        root_logger.removeHandler(_stream_handler)
+        _stream_handler.close()
+    level = verbosity_map[int(verbosity)]
+    _stream_handler = logging.StreamHandler(stream)
+    _stream_handler.setLevel(level)
+    _stream_handler.setFormatter(_get_formatter(stream_format))
+    if isinstance(stream, io.StringIO):
+        # in-memory buffers are only read by flush_log_buffer, so records
+        # can be passed on in batches
+        _stream_handler = MemoryHandler(
+            64, flushLevel=logging.WARNING, target=_stream_handler
+        )
+        _stream_handler.setLevel(level)
+    root_logger.addHandler(_stream_handler)
 
     # file handler
     if temp_file_handler:
@@ -84,9 +132,17 @@ def init_logger(
 
 def flush_log_buffer(stream):
     """ Flush buffered logs. """
+    # pass on records still held back by the handler for this stream
+    target = getattr(_stream_handler, "target", None)
+    if target is not None and target.stream is stream:
+        _stream_handler.flush()
+
     stream.flush()
     buffer = stream.getvalue()
-    stream.truncate(0)
+    # rewind before truncating, otherwise the next write would pad the
+    # buffer with null characters up to the previous position
+    stream.seek(0)
+    stream.truncate()
     if len(buffer):
         return buffer.rstrip("\n")
 
@@ -101,7 +157,7 @@ def print_log_buffer(stream):
 def raise_error(msg, logger=None):
     """ Log error as debug message and raise ClickException. """
     if logger is not None:
-        logger.debug(f"ERROR: {msg}")
+        logger.debug("ERROR: %s", msg)
 
     raise click.ClickException(msg)
 
@@ -115,7 +171,7 @@ def setup_stream_prompt(device_type, device_uid, stream_type):
     )
     if choice.lower() == "n":
         logger.warning(
-            f"Skipping {stream_type} setup for device '{device_uid}'"
+            "Skipping %s setup for device '%s'", stream_type, device_uid
         )
         return False
     else:
@@ -124,85 +180,80 @@ def setup_stream_prompt(device_type, device_uid, stream_type):
 
 def stream_name_prompt(config, default):
     """ Ask the user for the name of the stream. """
-    stream_name = (
-        input(
-            f"Enter stream name or press Enter to use the name '{default}': "
+    while True:
+        stream_name = (
+            input(
+                f"Enter stream name or press Enter to use the name "
+                f"'{default}': "
+            )
+            or default
         )
-        or default
-    )
-    if stream_name in config:
+        if stream_name not in config:
+            return stream_name
         logger.error(
-            f"Stream name {stream_name} already exists, please make a "
-            f"different choice"
+            "Stream name %s already exists, please make a different choice",
+            stream_name,
         )
-        return stream_name_prompt(config, default)
-    else:
-        return stream_name
 
 
 def fps_prompt(default):
     """ Ask the user for the desired fps. """
-    try:
+    while True:
         choice = (
             input(f"Enter FPS or press enter to set to {default}: ") or default
         )
-        return float(choice)
-    except ValueError:
-        logger.error("Invalid FPS, please try again.")
-        return fps_prompt(default)
+        try:
+            return float(choice)
+        except ValueError:
+            logger.error("Invalid FPS, please try again.")
+
+
+def mode_prompt(modes):
+    """ Ask the user to select a capture mode. """
+    mode_list = "\n".join(f" {idx}: {mode}" for idx, mode in enumerate(modes))
+    while True:
+        choice = input(
+            f"Please select a capture mode "
+            f"(horizontal res, vertical res, fps):\n"
+            f"{mode_list}\n"
+            f"Selection: "
+        )
+        try:
+            idx = int(choice)
+            # negative indices are valid for lists but not a valid choice
+            if idx < 0:
+                raise IndexError(idx)
+            return modes[idx]
+        except (ValueError, IndexError):
+            logger.error("Invalid choice, please try again.")
 
 
 def record_prompt(config, stream_type, stream_name):
     """ Ask the user whether they want to record a stream. """
     choice = input("Do you want to record this stream? ([y]/n): ")
     if choice.lower() != "n":
-        if stream_type not in config["commands"]["record"]:
-            config["commands"]["record"][stream_type] = {}
+        record_streams = config["commands"]["record"].setdefault(
+            stream_type, {}
+        )
         if stream_type == "video":
-            config["commands"]["record"][stream_type][stream_name] = {
+            record_streams[stream_name] = {
                 "codec": "libx264",
                 "encoder_kwargs": {"crf": "18", "preset": "ultrafast"},
             }
         else:
-            config["commands"]["record"][stream_type][stream_name] = None
+            record_streams[stream_name] = None
 
 
 def get_uvc_config(config, name, uid):
     """ Get config for a Pupil UVC cam. """
-    if name.endswith("ID0"):
-        stream_name = "eye0"
-    elif name.endswith("ID1"):
-        stream_name = "eye1"
-    elif name.endswith("ID2"):
-        stream_name = "world"
-    else:
-        stream_name = name
-
-    def mode_prompt(modes):
-        try:
-            choice = input(
-                f"Please select a capture mode "
-                f"(horizontal res, vertical res, fps):\n"
-                f" {pprint.pformat(modes).strip('{}')}\n"
-                f"Selection: "
-            )
-            return modes[int(choice)]
-        except (ValueError, KeyError):
-            logger.error("Invalid choice, please try again.")
-            return mode_prompt(modes)
+    stream_name = UVC_STREAM_NAMES.get(name[-3:], name)
 
     if setup_stream_prompt("pupil", name, "video"):
-        stream_name = stream_name_prompt(
-            config["streams"]["video"], stream_name
-        )
-        modes = {
-            idx: mode
-            for idx, mode in enumerate(
-                pri.VideoDeviceUVC._get_available_modes(uid)
-            )
-        }
+        video_streams = config["streams"]["video"]
+        stream_name = stream_name_prompt(video_streams, stream_name)
+        modes = list(pri.VideoDeviceUVC._get_available_modes(uid))
         selected_mode = mode_prompt(modes)
-        config["streams"]["video"][stream_name] = {
+        video_streams[stream_name] = {
             "device_type": "uvc",
             "device_uid": name,
             "resolution": str(selected_mode[:-1]),
@@ -212,9 +263,10 @@ def get_uvc_config(config, name, uid):
             else "bgr24",
         }
         record_prompt(config, "video", stream_name)
-        config["commands"]["estimate_cam_params"]["streams"][
-            stream_name
-        ] = None
+        cam_param_streams = config["commands"]["estimate_cam_params"][
+            "streams"
+        ]
+        cam_param_streams[stream_name] = None
 
     return config
 
@@ -225,10 +277,9 @@ def get_realsense_config(
     """ Get config for a RealSense device. """
     # video
     if setup_stream_prompt(device_type, serial, "video"):
-        stream_name = stream_name_prompt(
-            config["streams"]["video"], device_type
-        )
-        config["streams"]["video"][stream_name] = {
+        video_streams = config["streams"]["video"]
+        stream_name = stream_name_prompt(video_streams, device_type)
+        video_streams[stream_name] = {
             "resolution": str(resolution),
             "fps": fps,
             "device_type": device_type,
@@ -244,10 +295,9 @@ def get_realsense_config(
     # motion
     for motion_type in ("odometry", "accel", "gyro"):
         if setup_stream_prompt(device_type, serial, motion_type):
-            stream_name = stream_name_prompt(
-                config["streams"]["motion"], motion_type
-            )
-            config["streams"]["motion"][stream_name] = {
+            motion_streams = config["streams"]["motion"]
+            stream_name = stream_name_prompt(motion_streams, motion_type)
+            motion_streams[stream_name] = {
                 "device_type": device_type,
                 "device_uid": serial,
                 "motion_type": motion_type,
@@ -262,10 +312,9 @@ def get_flir_config(
 ):
     """ Get config for a FLIR camera. """
     if setup_stream_prompt(device_type, serial, "video"):
-        stream_name = stream_name_prompt(
-            config["streams"]["video"], device_type
-        )
-        config["streams"]["video"][stream_name] = {
+        video_streams = config["streams"]["video"]
+        stream_name = stream_name_prompt(video_streams, device_type)
+        video_streams[stream_name] = {
             "resolution": str(resolution),  # TODO get from cam
             "fps": fps_prompt(30.0),  # TODO get default from cam
             "device_type": device_type,
@@ -1,5 +1,3 @@
-import inspect
-
 import click
 import pupil_recording_interface as pri
 
@@ -27,7 +25,7 @@ from ved_capture.config import ConfigParser
 )
 def validate(config_file, verbose):
     """ Validate gaze mapping. """
-    ui = TerminalUI(inspect.stack()[0][3], verbosity=verbose)
+    ui = TerminalUI("validate", verbosity=verbose)
 
     # parse config
     with ConfigParser(config_file) as config_parser:
@@ -1,20 +1,25 @@
 """"""
-import csv
 import datetime
 import logging
+import os
+import re
 from ast import literal_eval
 from collections import OrderedDict, defaultdict
-from copy import deepcopy
+from copy import copy, deepcopy
 from distutils.version import StrictVersion
+from functools import lru_cache
 from pathlib import Path
+from string import Formatter
 
 import yaml
 from confuse import (
     Configuration,
+    ConfigSource,
     NotFoundError,
     ConfigTypeError,
     ConfigReadError,
     Dumper,
+    Loader,
 )
 import pupil_recording_interface as pri
 
@@ -23,49 +28,253 @@ APPNAME = "vedc"
 # maximum width of video windows
 MAX_WIDTH = 1280
 
+# recorder config classes by stream type
+RECORDER_TYPES = {
+    "video": pri.VideoRecorder.Config,
+    "motion": pri.MotionRecorder.Config,
+}
+
+# pipeline stages as (config class, kwargs), instantiated for each stream
+CALIBRATION_WORLD_STAGES = (
+    (pri.CircleDetector.Config, {"paused": True}),
+    (pri.Calibration.Config, {"save": True}),
+    (pri.GazeMapper.Config, {}),
+    (pri.VideoDisplay.Config, {"max_width": MAX_WIDTH}),
+)
+VALIDATION_WORLD_STAGES = (
+    (pri.Validation.Config, {"save": True}),
+    (pri.GazeMapper.Config, {}),
+    (pri.VideoDisplay.Config, {"max_width": MAX_WIDTH}),
+)
+EYE_STAGES = {
+    "eye0": (
+        (pri.PupilDetector.Config, {}),
+        (pri.VideoDisplay.Config, {"flip": True}),
+    ),
+    "eye1": ((pri.PupilDetector.Config, {}), (pri.VideoDisplay.Config, {})),
+}
+
+# marker for getters called without a default value
+_NOTSET = object()
+
+# maximum number of parsed YAML files kept in memory
+YAML_CACHE_SIZE = 32
+
+# default config shipped with the package
+DEFAULT_CONFIG_FILE = os.path.join(
+    os.path.dirname(__file__), "config_default.yaml"
+)
+
 logger = logging.getLogger(__name__)
 
+_formatter = Formatter()
+
+# parsed YAML files by (path, mtime, size), least recently used first
+_yaml_cache = OrderedDict()
+
+# scalar types that can be shared between copies of parsed YAML data
+_IMMUTABLE_TYPES = frozenset(
+    (str, int, float, bool, type(None), datetime.date, datetime.datetime)
+)
+
+# confuse's Dumper on top of libyaml, if available. Config files are still
+# read with confuse's Loader, which e.g. allows plain scalars like %Y-%m-%d
+# that the libyaml scanner rejects.
+if getattr(yaml, "__with_libyaml__", False):
+
+    class _Dumper(yaml.CSafeDumper, Dumper):
+        """ YAML dumper with confuse's representers and the C emitter. """
+
+else:
+    _Dumper = Dumper
+
+
+def _build_stages(stages):
+    """ Create new pipeline stage configs from (class, kwargs) specs. """
+    return tuple(config_class(**kwargs) for config_class, kwargs in stages)
+
+
+@lru_cache(maxsize=64)
+def _eval_resolution(resolution):
+    """ Evaluate a resolution string like "(1280, 720)". """
+    # fast path for exactly one pair of parentheses around two integers
+    if resolution.startswith("(") and resolution.endswith(")"):
+        try:
+            width, height = resolution[1:-1].split(",")
+            return int(width), int(height)
+        except ValueError:
+            pass
+
+    # anything else, the cached result is shared between callers so it must
+    # be immutable
+    return tuple(literal_eval(resolution))
+
+
+def _parse_resolution(resolution):
+    """ Parse a resolution from a string or a sequence into a tuple. """
+    if isinstance(resolution, str):
+        return _eval_resolution(resolution)
+    else:
+        return tuple(resolution)
+
+
+@lru_cache(maxsize=16)
+def _compile_template(template):
+    """ Parse a format string into (literal, field, spec, conversion). """
+    return tuple(_formatter.parse(template))
+
+
+@lru_cache(maxsize=16)
+def _template_fields(template):
+    """ Get the names of all arguments required by a format string. """
+    fields = set()
+    for _, field, spec, _ in _compile_template(template):
+        if field is not None:
+            # "today.year" and "items[0]" require "today" and "items"
+            fields.add(re.split(r"[.[]", field, 1)[0])
+            if "{" in spec:
+                fields.update(_template_fields(spec))
+
+    return frozenset(fields)
+
+
+def _format_template(template, **kwargs):
+    """ Format a string like str.format, parsing it only once. """
+    parts = []
+    for literal, field, spec, conversion in _compile_template(template):
+        parts.append(literal)
+        if field is not None:
+            value, _ = _formatter.get_field(field, (), kwargs)
+            value = _formatter.convert_field(value, conversion)
+            if "{" in spec:
+                spec = _formatter.vformat(spec, (), kwargs)
+            parts.append(format(value, spec))
+
+    return "".join(parts)
+
+
+@lru_cache(maxsize=4)
+def _config_dir(env_dir):
+    """ Resolve the user config directory once per value of VEDCDIR. """
+    return Configuration(APPNAME, "ved_capture", read=False).config_dir()
+
+
+def _fast_clone(value):
+    """ Copy a tree of parsed YAML data without deepcopy's overhead. """
+    value_type = type(value)
+    if value_type in (dict, OrderedDict):
+        return value_type(
+            (key, _fast_clone(item)) for key, item in value.items()
+        )
+    elif value_type is list:
+        return [_fast_clone(item) for item in value]
+    elif value_type in _IMMUTABLE_TYPES:
+        return value
+    else:
+        return deepcopy(value)
+
+
+def _load_config_file(filename, default=False):
+    """ Load a YAML config file as a source, re-using cached parse results. """
+    filename = os.path.abspath(filename)
+    try:
+        stat = os.stat(filename)
+        key = (filename, stat.st_mtime_ns, stat.st_size)
+    except OSError as e:
+        raise ConfigReadError(filename, e)
+
+    if key in _yaml_cache:
+        _yaml_cache.move_to_end(key)
+    else:
+        try:
+            # read the whole file at once and parse it from memory
+            with open(filename, "rb") as f:
+                data = yaml.load(f.read(), Loader=Loader) or {}
+        except (OSError, yaml.YAMLError) as e:
+            raise ConfigReadError(filename, e)
+        if not isinstance(data, dict):
+            raise ConfigReadError(filename, "top-level value is not a dict")
+        _yaml_cache[key] = data
+        if len(_yaml_cache) > YAML_CACHE_SIZE:
+            _yaml_cache.popitem(last=False)
+
+    # each source gets its own copy so the cached data can't be modified
+    return ConfigSource(_fast_clone(_yaml_cache[key]), filename, default)
+
 
 class ConfigParser:
     """ Parser for application config. """
 
     def __init__(self, config_file=None, ignore_user=False):
         """ Constructor. """
-        try:
-            self.config = Configuration(APPNAME, "ved_capture", read=False)
-        except ConfigReadError as e:
-            from ved_capture.cli.utils import raise_error
-
-            raise_error(str(e), logger)
-
         if config_file is not None:
             if str(config_file).endswith(".yaml"):
                 self.config_file = config_file
             else:
-                self.config_file = (
-                    Path(self.config.config_dir()) / f"{config_file}.yaml"
+                self.config_file = os.path.join(
+                    self.config_dir(), f"{config_file}.yaml"
                 )
-            self.config.set_file(self.config_file)
-            logger.debug(f"Loaded configuration from {config_file}")
         else:
             self.config_file = None
 
         # ignore user config if config file provided or explicitly ignored
-        if config_file is not None or ignore_user:
-            self.config.read(user=False)
-        else:
-            self.config.read()
+        self._read_user = config_file is None and not ignore_user
+
+        # config files are only read when the config is first accessed
+        self._config = None
+        self._legacy = None
+
+        # cache for _get_config, invalidated when config sources are added
+        self._cache = {}
+        self._cache_token = None
+
+    def _load(self):
+        """ Read all config sources. """
+        try:
+            config = Configuration(APPNAME, "ved_capture", read=False)
+        except ConfigReadError as e:
+            from ved_capture.cli.utils import raise_error
+
+            raise_error(str(e), logger)
+
+        if self.config_file is not None:
+            config.set(_load_config_file(self.config_file))
+            logger.debug("Loaded configuration from %s", self.config_file)
+
+        # user config and defaults go through the parse cache as well
+        if self._read_user:
+            user_config_file = config.user_config_path()
+            if os.path.isfile(user_config_file):
+                config.add(_load_config_file(user_config_file))
+
+        config.add(_load_config_file(DEFAULT_CONFIG_FILE, default=True))
 
         # check if legacy format (user-defined config overrides all defaults)
-        self.legacy = (
-            StrictVersion(self.config["version"].get(str)).version[0] < 2
-        )
-        if self.legacy:
+        self._legacy = StrictVersion(config["version"].get(str)).version[0] < 2
+        if self._legacy:
             logger.warning(
                 "You are using an outdated config file format, "
                 "run 'vedc auto_config' to update"
             )
 
+        self._config = config
+
+    @property
+    def config(self):
+        """ The confuse configuration, read on first access. """
+        if self._config is None:
+            self._load()
+
+        return self._config
+
+    @property
+    def legacy(self):
+        """ Whether the config uses the legacy format. """
+        if self._config is None:
+            self._load()
+
+        return self._legacy
+
     def __enter__(self):
         return self
 
@@ -84,19 +293,69 @@ class ConfigParser:
     @classmethod
     def config_dir(cls):
         """ Directory for user configuration. """
-        return Configuration(APPNAME, "ved_capture").config_dir()
+        return _config_dir(os.environ.get(APPNAME.upper() + "DIR"))
 
-    def _get_config(self, category, subcategory, *subkeys, datatype=None):
-        """ Get config value. """
+    def _get_config(
+        self, category, subcategory, *subkeys, datatype=None, default=_NOTSET
+    ):
+        """ Get config value, or default if given and the value is missing. """
+        # setting values (e.g. in set_profile) adds a new config source
+        token = len(self.config.sources)
+        if token != self._cache_token:
+            self._cache.clear()
+            self._cache_token = token
+
+        key = (category, subcategory, subkeys, datatype)
         try:
-            override = self.config[category]["override"].get(bool)
-        except (ConfigTypeError, NotFoundError):
-            override = False
+            value = self._cache[key]
+        except KeyError:
+            try:
+                value = self._lookup_config(
+                    category, subcategory, *subkeys, datatype=datatype
+                )
+            except NotFoundError as e:
+                value = NotFoundError(*e.args)
+            self._cache[key] = value
+
+        if isinstance(value, NotFoundError):
+            if default is not _NOTSET:
+                return default
+            raise NotFoundError(*value.args)
+        elif isinstance(value, (dict, list)):
+            # callers only replace top-level items, nested data is shared
+            return copy(value)
+        else:
+            return value
+
+    def _get_override(self, category):
+        """ Check if the user config overrides the defaults for a category. """
+        key = ("override", category)
+        if key not in self._cache:
+            try:
+                override = self.config[category]["override"].get(bool)
+            except (ConfigTypeError, NotFoundError):
+                override = False
+            self._cache[key] = override
+
+        return self._cache[key]
+
+    def _get_root(self, category, subcategory):
+        """ Get the user-defined dict for a subcategory in override mode. """
+        key = ("root", category, subcategory)
+        if key not in self._cache:
+            self._cache[key] = self.config[category][subcategory].get(dict)
+
+        return self._cache[key]
+
+    def _lookup_config(self, category, subcategory, *subkeys, datatype=None):
+        """ Look up config value without caching. """
+        override = self._get_override(category)
 
         # override/legacy mode: user-defined config overrides defaults
         if override or self.legacy:
             try:
-                value = deepcopy(self.config[category][subcategory].get(dict))
+                # no copy needed here, _get_config copies cached dicts
+                value = self._get_root(category, subcategory)
                 for key in subkeys:
                     value = value[key]
                 return value
@@ -133,201 +392,254 @@ class ConfigParser:
         settings = self._get_config("profiles", profile)
         self.config["streams"].set(settings)
 
-    def get_command_config(self, command, *subkeys, datatype=None):
+    def get_command_config(
+        self, command, *subkeys, datatype=None, default=_NOTSET
+    ):
         """ Get configuration for a CLI command. """
         return self._get_config(
-            "commands", command, *subkeys, datatype=datatype
+            "commands", command, *subkeys, datatype=datatype, default=default
         )
 
-    def get_stream_config(self, stream_type, name, *subkeys, datatype=None):
+    def get_stream_config(
+        self, stream_type, name, *subkeys, datatype=None, default=_NOTSET
+    ):
         """ Get configuration for a stream. """
         return self._get_config(
-            "streams", stream_type, name, *subkeys, datatype=datatype
+            "streams",
+            stream_type,
+            name,
+            *subkeys,
+            datatype=datatype,
+            default=default,
         )
 
+    def _get_stream_configs(self, stream_type, names):
+        """ Get configurations for several streams with a single lookup. """
+        if not names:
+            return {}
+
+        streams = self._get_config("streams", stream_type)
+        try:
+            # copy each stream config, nested data is shared with the cache
+            return {name: copy(streams[name]) for name in names}
+        except KeyError as e:
+            raise NotFoundError(f"streams.{stream_type}.{e.args[0]} not found")
+
     def get_folder(self, command, folder=None, **metadata):
         """ Resolve folder for command. """
         if folder is not None:
             return folder
 
-        try:
-            folder = self.get_command_config(command, "folder", datatype=str)
-            if folder is not None:
-                try:
-                    folder = folder.format(
-                        cwd=Path.cwd(),
-                        cfgd=Path(
-                            self.config_file or self.config.config_dir()
-                        ).parent,
-                        today=datetime.datetime.today(),
-                        **metadata,
-                    )
-                    return Path(folder).expanduser()
-                except KeyError as e:
-                    raise ValueError(
-                        f"Format spec in commands.{command}.folder requires "
-                        f"{e} to be defined in commands.{command}.metadata"
-                    )
-            else:
-                return Path.cwd()
-        except NotFoundError:
+        folder = self.get_command_config(
+            command, "folder", datatype=str, default=None
+        )
+        if folder is None:
             return Path.cwd()
+        elif "{" not in folder:
+            # nothing to format
+            return Path(folder).expanduser()
+
+        # check for all missing metadata fields before formatting
+        missing = _template_fields(folder).difference(
+            metadata, ("cwd", "cfgd", "today")
+        )
+        if missing:
+            raise ValueError(
+                f"Format spec in commands.{command}.folder requires "
+                f"{', '.join(map(repr, sorted(missing)))} to be defined in "
+                f"commands.{command}.metadata"
+            )
+
+        folder = _format_template(
+            folder,
+            cwd=Path.cwd(),
+            cfgd=Path(self.config_file or self.config_dir()).parent,
+            today=datetime.datetime.today(),
+            **metadata,
+        )
+
+        return Path(folder).expanduser()
 
     def get_policy(self, command, policy=None):
         """ Get policy for command. """
-        try:
-            return policy or self.get_command_config(
-                command, "policy", datatype=str
-            )
-        except NotFoundError:
-            return "new_folder"
+        return policy or self.get_command_config(
+            command, "policy", datatype=str, default="new_folder"
+        )
 
     def get_duration(self, command, duration=None):
         """ Get duration for command. """
-        try:
-            return duration or self.get_command_config(command, "duration")
-        except NotFoundError:
-            return None
+        return duration or self.get_command_config(
+            command, "duration", default=None
+        )
 
     def get_show_video(self, show_video=None):
         """ Get show_video flag. """
         if show_video is None:
-            try:
-                return self.get_command_config(
-                    "record", "show_video", datatype=bool
-                )
-            except NotFoundError:
-                return False
+            return self.get_command_config(
+                "record", "show_video", datatype=bool, default=False
+            )
         else:
             return show_video
 
     def get_recording_cam_params(self):
         """ Get video streams for which to copy intrinsics and extrinsics. """
-        try:
-            intrinsics = self.get_command_config(
-                "record", "intrinsics", datatype=list
-            )
-        except NotFoundError:
-            intrinsics = []
-
-        try:
-            extrinsics = self.get_command_config(
-                "record", "extrinsics", datatype=list
-            )
-        except NotFoundError:
-            extrinsics = []
+        intrinsics = self.get_command_config(
+            "record", "intrinsics", datatype=list, default=[]
+        )
+        extrinsics = self.get_command_config(
+            "record", "extrinsics", datatype=list, default=[]
+        )
 
         return intrinsics, extrinsics
 
     def get_metadata(self):
         """ Get recording metadata. """
-        try:
-            fields = self.get_command_config("record", "metadata")
-        except NotFoundError:
-            return {}
+        fields = self.get_command_config("record", "metadata", default=None)
 
+        # build all prompts up front and ask for them in a single loop
         if isinstance(fields, list):
-            print("Please enter the following metadata:")
-            metadata = {field: input(f"- {field}: ") for field in fields}
-            print("")
-            return metadata
-        if isinstance(fields, (OrderedDict, dict)):
-            print(
+            header = "Please enter the following metadata:"
+            prompts = [(field, f"- {field}: ", "") for field in fields]
+        elif isinstance(fields, dict):
+            header = (
                 "Please enter the following metadata (press Enter to accept "
                 "default values in square brackets):"
             )
-            metadata = {
-                field: (
-                    input(f"- {field} [{default}]: ")
-                    if default is not None
-                    else input(f"- {field}: ")
+            prompts = [
+                (
+                    field,
+                    f"- {field}: "
+                    if default is None
+                    else f"- {field} [{default}]: ",
+                    default,
                 )
-                or default
                 for field, default in fields.items()
-            }
-            print("")
-            return metadata
+            ]
         else:
             return {}
 
-    def _get_recording_pipeline(self, config, name, stream_type):
-        """ Get recording pipeline for stream config. """
-        recorder_types = {
-            "video": pri.VideoRecorder.Config,
-            "motion": pri.MotionRecorder.Config,
-        }
+        # fields can be set as e.g. VEDC_META_SUBJECT_ID for scripted runs
+        metadata = {}
+        interactive = True
+        for field, prompt, default in prompts:
+            value = os.environ.get(f"{APPNAME.upper()}_META_{field.upper()}")
+            if value is None and interactive:
+                if header is not None:
+                    print(header)
+                    header = None
+                try:
+                    value = input(prompt) or default
+                except EOFError:
+                    # no more input, use defaults for the remaining fields
+                    interactive = False
+            metadata[field] = default if value is None else value
 
-        if "pipeline" not in config:
-            config["pipeline"] = []
+        if header is None:
+            print("")
 
-        command_config = self.get_command_config("record", stream_type, name)
-        config["pipeline"].append(
-            recorder_types[stream_type](**(command_config or {}))
-        )
+        return metadata
+
+    def _get_recording_pipeline(
+        self,
+        config,
+        name,
+        stream_type,
+        show_video=None,
+        command_config=_NOTSET,
+    ):
+        """ Get recording pipeline for stream config. """
+        # build the pipeline in a new list, the config may share data
+        pipeline = list(config.get("pipeline", ()))
+
+        if command_config is _NOTSET:
+            command_config = self.get_command_config(
+                "record", stream_type, name
+            )
+        recorder = RECORDER_TYPES[stream_type](**(command_config or {}))
         if stream_type == "video":
-            config["pipeline"].append(
-                pri.VideoDisplay.Config(
-                    max_width=MAX_WIDTH, paused=not self.get_show_video()
+            if show_video is None:
+                show_video = self.get_show_video()
+            pipeline.extend(
+                (
+                    recorder,
+                    pri.VideoDisplay.Config(
+                        max_width=MAX_WIDTH, paused=not show_video
+                    ),
                 )
             )
+        else:
+            pipeline.append(recorder)
+
+        config["pipeline"] = pipeline
 
         return config
 
     def get_recording_configs(self):
         """ Get list of configurations for recording. """
         configs = []
-
-        for name in self.get_command_config("record", "video") or {}:
-            config = self.get_stream_config("video", name)
-            config["resolution"] = literal_eval(config["resolution"])
-            config = self._get_recording_pipeline(config, name, "video")
-            configs.append(pri.VideoStream.Config(name=name, **config))
-            logger.debug(
-                f"Adding video stream '{name}' with config: {dict(config)}"
+        # recorder settings by stream name
+        video_names = self.get_command_config("record", "video") or {}
+        motion_names = self.get_command_config("record", "motion") or {}
+        show_video = self.get_show_video()
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        video_configs = self._get_stream_configs("video", video_names)
+        motion_configs = self._get_stream_configs("motion", motion_names)
+
+        for name, config in video_configs.items():
+            config["resolution"] = _parse_resolution(config["resolution"])
+            config = self._get_recording_pipeline(
+                config, name, "video", show_video, video_names[name]
             )
+            configs.append(pri.VideoStream.Config(name=name, **config))
+            if debug:
+                logger.debug(
+                    "Adding video stream '%s' with config: %s",
+                    name,
+                    dict(config),
+                )
 
-        for name in self.get_command_config("record", "motion") or {}:
-            config = self.get_stream_config("motion", name)
-            config = self._get_recording_pipeline(config, name, "motion")
-            configs.append(pri.MotionStream.Config(name=name, **config))
-            logger.debug(
-                f"Adding motion stream '{name}' with config: {dict(config)}"
+        for name, config in motion_configs.items():
+            config = self._get_recording_pipeline(
+                config, name, "motion", command_config=motion_names[name]
             )
+            configs.append(pri.MotionStream.Config(name=name, **config))
+            if debug:
+                logger.debug(
+                    "Adding motion stream '%s' with config: %s",
+                    name,
+                    dict(config),
+                )
 
         return configs
 
     def _get_validation_pipeline(self, config, cam_type, name):
         """ Get validation pipeline for stream config. """
-        if "pipeline" not in config:
-            config["pipeline"] = []
+        # build the pipeline in a new list, the config may share data
+        pipeline = list(config.get("pipeline", ()))
 
         if cam_type == "world":
-            try:
-                if self.legacy:
-                    circle_detector_params = self.get_command_config(
-                        "validate", "settings", "circle_detector"
-                    )
-                else:
-                    circle_detector_params = self.get_command_config(
-                        "validate", "settings", name, "circle_detector"
-                    )
-            except NotFoundError:
-                circle_detector_params = {}
-
-            config["pipeline"].append(
+            if self.legacy:
+                circle_detector_params = self.get_command_config(
+                    "validate", "settings", "circle_detector", default={}
+                )
+            else:
+                circle_detector_params = self.get_command_config(
+                    "validate",
+                    "settings",
+                    name,
+                    "circle_detector",
+                    default={},
+                )
+
+            pipeline.append(
                 pri.CircleDetector.Config(**circle_detector_params)
             )
-            config["pipeline"].append(pri.Validation.Config(save=True))
-            config["pipeline"].append(pri.GazeMapper.Config())
-            config["pipeline"].append(
-                pri.VideoDisplay.Config(max_width=MAX_WIDTH)
-            )
-        elif cam_type == "eye0":
-            config["pipeline"].append(pri.PupilDetector.Config())
-            config["pipeline"].append(pri.VideoDisplay.Config(flip=True))
-        elif cam_type == "eye1":
-            config["pipeline"].append(pri.PupilDetector.Config())
-            config["pipeline"].append(pri.VideoDisplay.Config())
+            pipeline.extend(_build_stages(VALIDATION_WORLD_STAGES))
+        elif cam_type in EYE_STAGES:
+            pipeline.extend(_build_stages(EYE_STAGES[cam_type]))
+
+        config["pipeline"] = pipeline
 
         return config
 
@@ -338,7 +650,7 @@ class ConfigParser:
         for cam_type in ("world", "eye0", "eye1"):
             name = self.get_command_config("validate", cam_type, datatype=str)
             config = self.get_stream_config("video", name)
-            config["resolution"] = literal_eval(config["resolution"])
+            config["resolution"] = _parse_resolution(config["resolution"])
             config = self._get_validation_pipeline(
                 config or {}, cam_type, name
             )
@@ -348,22 +660,15 @@ class ConfigParser:
 
     def _get_calibration_pipeline(self, config, cam_type):
         """ Get calibration pipeline for stream config. """
-        if "pipeline" not in config:
-            config["pipeline"] = []
+        # build the pipeline in a new list, the config may share data
+        pipeline = list(config.get("pipeline", ()))
 
         if cam_type == "world":
-            config["pipeline"].append(pri.CircleDetector.Config(paused=True))
-            config["pipeline"].append(pri.Calibration.Config(save=True))
-            config["pipeline"].append(pri.GazeMapper.Config())
-            config["pipeline"].append(
-                pri.VideoDisplay.Config(max_width=MAX_WIDTH)
-            )
-        elif cam_type == "eye0":
-            config["pipeline"].append(pri.PupilDetector.Config())
-            config["pipeline"].append(pri.VideoDisplay.Config(flip=True))
-        elif cam_type == "eye1":
-            config["pipeline"].append(pri.PupilDetector.Config())
-            config["pipeline"].append(pri.VideoDisplay.Config())
+            pipeline.extend(_build_stages(CALIBRATION_WORLD_STAGES))
+        elif cam_type in EYE_STAGES:
+            pipeline.extend(_build_stages(EYE_STAGES[cam_type]))
+
+        config["pipeline"] = pipeline
 
         return config
 
@@ -374,7 +679,7 @@ class ConfigParser:
         for cam_type in ("world", "eye0", "eye1"):
             name = self.get_command_config("calibrate", cam_type, datatype=str)
             config = self.get_stream_config("video", name)
-            config["resolution"] = literal_eval(config["resolution"])
+            config["resolution"] = _parse_resolution(config["resolution"])
             config = self._get_calibration_pipeline(config or {}, cam_type)
             configs.append(pri.VideoStream.Config(name=name, **config))
 
@@ -384,35 +689,34 @@ class ConfigParser:
         self, config, name, streams, master, extrinsics=False
     ):
         """ Get camera parameter estimator pipeline for stream config. """
-        if "pipeline" not in config:
-            config["pipeline"] = []
+        # build the pipeline in a new list, the config may share data
+        pipeline = list(config.get("pipeline", ()))
 
-        try:
-            if self.legacy:
-                detector_params = self.get_command_config(
-                    "estimate_cam_params", "streams", name
-                )
-            else:
-                detector_params = self.get_command_config(
-                    "estimate_cam_params",
-                    "settings",
-                    name,
-                    "circle_grid_detector",
-                )
-        except NotFoundError:
-            detector_params = {}
+        if self.legacy:
+            detector_params = self.get_command_config(
+                "estimate_cam_params", "streams", name, default={}
+            )
+        else:
+            detector_params = self.get_command_config(
+                "estimate_cam_params",
+                "settings",
+                name,
+                "circle_grid_detector",
+                default={},
+            )
 
-        config["pipeline"].append(
-            pri.CircleGridDetector.Config(**detector_params)
-        )
+        detector = pri.CircleGridDetector.Config(**detector_params)
+        display = pri.VideoDisplay.Config(max_width=MAX_WIDTH)
         if master:
             # first stream gets cam param estimator
-            config["pipeline"].append(
-                pri.CamParamEstimator.Config(
-                    streams=streams, extrinsics=extrinsics
-                )
+            estimator = pri.CamParamEstimator.Config(
+                streams=streams, extrinsics=extrinsics
             )
-        config["pipeline"].append(pri.VideoDisplay.Config(max_width=MAX_WIDTH))
+            pipeline.extend((detector, estimator, display))
+        else:
+            pipeline.extend((detector, display))
+
+        config["pipeline"] = pipeline
 
         return config
 
@@ -424,7 +728,7 @@ class ConfigParser:
 
         for idx, name in enumerate(streams):
             config = self.get_stream_config("video", name)
-            config["resolution"] = literal_eval(config["resolution"])
+            config["resolution"] = _parse_resolution(config["resolution"])
             config = self._get_cam_param_pipeline(
                 config or {}, name, streams, idx == 0, extrinsics
             )
@@ -438,21 +742,36 @@ class ConfigParser:
 
         for idx, name in enumerate(streams):
             config = self.get_stream_config("video", name)
-            config["resolution"] = literal_eval(config["resolution"])
+            config["resolution"] = _parse_resolution(config["resolution"])
             config["pipeline"] = [pri.VideoDisplay.Config()]
             configs.append(pri.VideoStream.Config(name=name, **config))
 
         return configs
 
 
+def _csv_escape(value):
+    """ Format a CSV field, quoting only when necessary like csv.writer. """
+    if value is None:
+        return ""
+
+    value = str(value)
+    if any(char in value for char in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    else:
+        return value
+
+
 def save_metadata(folder, metadata):
     """ Save metadata to user_info.csv. """
-    with open(Path(folder) / "user_info.csv", "w") as f:
-        w = csv.writer(f)
-        w.writerow(["key", "value"])
-        w.writerows(metadata.items())
+    content = "key,value\r\n" + "".join(
+        f"{_csv_escape(key)},{_csv_escape(value)}\r\n"
+        for key, value in metadata.items()
+    )
+
+    with open(os.path.join(folder, "user_info.csv"), "w", newline="") as f:
+        f.write(content)
 
-    logger.debug(f"Saved user_info.csv to {folder}")
+    logger.debug("Saved user_info.csv to %s", folder)
 
 
 def flatten(view):
@@ -474,9 +793,21 @@ def flatten(view):
 
 def default_to_regular(d):
     """ Convert nested defaultdict to nested regular dict. """
-    if isinstance(d, defaultdict):
-        d = {k: default_to_regular(v) for k, v in d.items()}
-    return d
+    if not isinstance(d, defaultdict):
+        return d
+
+    # walk the tree with an explicit stack instead of recursing
+    out = dict(d)
+    stack = [out]
+    while stack:
+        current = stack.pop()
+        for key, value in current.items():
+            if isinstance(value, defaultdict):
+                value = dict(value)
+                current[key] = value
+                stack.append(value)
+
+    return out
 
 
 def save_config(folder, config, name="config"):
@@ -484,10 +815,12 @@ def save_config(folder, config, name="config"):
     if isinstance(config, Configuration):
         config = flatten(config)
     else:
-        config = OrderedDict(default_to_regular(config))
+        # confuse's Dumper represents plain dicts in insertion order
+        config = default_to_regular(config)
 
-    # save to folder
-    with open(Path(folder) / f"{name}.yaml", "w") as f:
-        yaml.dump(config, f, Dumper)
+    # dump to a string first so the file is written in one go
+    content = yaml.dump(config, Dumper=_Dumper)
+    with open(os.path.join(folder, f"{name}.yaml"), "w") as f:
+        f.write(content)
 
-    logger.debug(f"Saved {name}.yaml to {folder}")
+    logger.debug("Saved %s.yaml to %s", name, folder)
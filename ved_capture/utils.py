@@ -2,10 +2,14 @@
 import os
 import json
 import logging
+import queue
 import re
 import shutil
 import subprocess
+import threading
 import time
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
 from select import select
 
@@ -23,6 +27,9 @@ from ved_capture.config import ConfigParser
 
 logger = logging.getLogger(__name__)
 
+_beep_queue = queue.Queue()
+_beep_thread = None
+
 
 def log_as_warning_or_debug(data):
     """ Log message as warning, unless it's known to be a debug message. """
@@ -382,9 +389,9 @@ def copy_cam_params(
                 _copy_cam_params(stream, src_folder, dst_folder, "extrinsics")
 
 
-def beep(freq=440, fs=44100, seconds=0.1, fade_len=0.01):
-    """ Make a beep noise to indicate recording state. """
-
+@lru_cache(maxsize=16)
+def _get_beep_audio(freq, fs, seconds, fade_len):
+    """ Generate the waveform for a beep. """
     t = np.linspace(0, seconds, int(fs * seconds))
 
     if seconds > 2 * fade_len:
@@ -399,18 +406,46 @@ def beep(freq=440, fs=44100, seconds=0.1, fade_len=0.01):
     else:
         fade_window = 1
 
+    notes = np.hstack([np.sin(f * t * 2 * np.pi) * fade_window for f in freq])
+    return (notes * (2 ** 15 - 1) / np.max(np.abs(notes))).astype(np.int16)
+
+
+def _beep_worker():
+    """ Play queued beeps one after another. """
+    # keep references to the last play objects so that they don't get
+    # garbage collected while playing
+    play_objs = deque(maxlen=8)
+
+    while True:
+        freq, fs, seconds, fade_len = _beep_queue.get()
+        try:
+            audio = _get_beep_audio(freq, fs, seconds, fade_len)
+            play_objs.append(simpleaudio.play_buffer(audio, 1, 2, fs))
+            # TODO play_obj.wait_done() blocks if there's an error
+            time.sleep(len(freq) * seconds)
+        except SimpleaudioError as e:
+            logger.error("Error playing sound: %s", e)
+        except Exception:
+            # keep the worker alive so that later beeps are still played
+            logger.exception("Error playing sound")
+
+
+def beep(freq=440, fs=44100, seconds=0.1, fade_len=0.01):
+    """ Make a beep noise to indicate recording state.
+
+    The beep is played in a background thread, this function returns
+    immediately.
+    """
+    global _beep_thread
+
     if not isinstance(freq, list):
         freq = [freq]
 
-    notes = np.hstack([np.sin(f * t * 2 * np.pi) * fade_window for f in freq])
-    audio = (notes * (2 ** 15 - 1) / np.max(np.abs(notes))).astype(np.int16)
+    if _beep_thread is None:
+        _beep_thread = threading.Thread(target=_beep_worker, daemon=True)
+        _beep_thread.start()
 
-    try:
-        play_obj = simpleaudio.play_buffer(audio, 1, 2, fs)  # noqa
-        # TODO play_obj.wait_done() blocks if there's an error
-        time.sleep(len(freq) * seconds)
-    except SimpleaudioError as e:
-        logger.error(f"Error playing sound: {e}")
+    _beep_queue.put_nowait((tuple(freq), fs, seconds, fade_len))
 
 
 def set_profile(config_parser, profile, metadata):